@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 *-*
+
+""" A local stand-in for the Jolokia agent of an ActiveMQ Artemis broker.
+
+    Usage: benchmark/fake_jolokia.py [--port PORT] [--queues N] [--latency SECONDS] [--error-rate RATE]
+
+    It emulates the broker and queue MBeans read by check_activemq.py for N
+    queues (Q.00000, Q.00001, ...) plus DLQ and ExpiryQueue, and answers
+    GET and bulk POST reads, wildcard ObjectName reads and searches. Every HTTP
+    request is delayed by --latency seconds and every single read fails with
+    probability --error-rate. GET /__stats returns the number of HTTP
+    requests, Jolokia requests and bulk requests served so far.
+    The credentials are admin:admin, like the defaults of the plugin. """
+
+import argparse
+import base64
+import fnmatch
+import json
+import random
+import threading
+import time
+
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urllib import unquote
+except ImportError:  # Python 3
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import unquote
+
+PREFIX = 'org.apache.activemq.artemis'
+
+
+def parse_object_name(name):
+    # splits an ObjectName into its domain and properties, keeping quoted values as they are
+    domain, _, props = name.partition(':')
+    result = {}
+    key, buf, quoted = None, '', False
+    for ch in props + ',':
+        if ch == '"':
+            quoted = not quoted
+            buf += ch
+        elif ch == '=' and not quoted and key is None:
+            key, buf = buf, ''
+        elif ch == ',' and not quoted:
+            if key is not None:
+                result[key] = buf
+            elif buf == '*':
+                result['*'] = '*'
+            key, buf = None, ''
+        else:
+            buf += ch
+    return domain, result
+
+
+class Broker(object):
+    def __init__(self, name, queues):
+        self.name = name
+        self.started = True
+        self.queues = {}
+        for i in range(queues):
+            queue = 'Q.%05d' % i
+            self.queues[queue] = self.new_queue(queue, i)
+        for queue in ('DLQ', 'ExpiryQueue'):
+            self.queues[queue] = self.new_queue(queue, 0)
+        self.extra_addresses = ['activemq.notifications']
+
+    @staticmethod
+    def new_queue(name, i):
+        return {'Name': name, 'Address': name, 'RoutingType': 'ANYCAST',
+                'MessageCount': i % 50, 'MessagesAdded': 1000 + i, 'MessagesAcknowledged': 1000,
+                'ConsumerCount': i % 3, 'DeliveringCount': 0, 'Paused': False,
+                'ExpiryAddress': 'ExpiryQueue', 'DeadLetterAddress': 'DLQ'}
+
+    def broker_name(self):
+        return '%s:broker="%s"' % (PREFIX, self.name)
+
+    def queue_name(self, queue):
+        return ('%s:broker="%s",component=addresses,address="%s",subcomponent=queues,'
+                'routing-type="anycast",queue="%s"' % (PREFIX, self.name, queue, queue))
+
+    def broker_attrs(self):
+        return {'Started': self.started, 'AddressMemoryUsagePercentage': 3,
+                'AddressNames': sorted(list(self.queues) + self.extra_addresses),
+                'Version': '2.31.0', 'ConnectionCount': 7}
+
+    def mbeans(self):
+        yield self.broker_name(), self.broker_attrs
+        for queue in sorted(self.queues):
+            yield self.queue_name(queue), (lambda queue=queue: self.queues[queue])
+
+    @staticmethod
+    def matches(pattern, name):
+        pattern_domain, pattern_props = parse_object_name(pattern)
+        domain, props = parse_object_name(name)
+        if not fnmatch.fnmatchcase(domain, pattern_domain):
+            return False
+        wildcard_tail = pattern_props.pop('*', None) is not None
+        for key, value in pattern_props.items():
+            if key not in props or not fnmatch.fnmatchcase(props[key], value):
+                return False
+        return wildcard_tail or set(pattern_props) == set(props)
+
+    def read(self, mbean, attribute=None):
+        if '*' in mbean or '?' in mbean:
+            value = {}
+            for name, attrs in self.mbeans():
+                if self.matches(mbean, name):
+                    value[name] = self.select(attrs(), attribute, keep_dict=True)
+            if not value:
+                return 404, 'javax.management.InstanceNotFoundException', mbean
+            return 200, None, value
+        for name, attrs in self.mbeans():
+            if name == mbean:
+                attributes = attrs()
+                if attribute and not isinstance(attribute, list) and attribute not in attributes:
+                    return 404, 'javax.management.AttributeNotFoundException', attribute
+                return 200, None, self.select(attributes, attribute)
+        return 404, 'javax.management.InstanceNotFoundException', mbean
+
+    @staticmethod
+    def select(attrs, attribute, keep_dict=False):
+        if attribute is None:
+            return dict(attrs)
+        if isinstance(attribute, list):
+            return dict((key, attrs.get(key)) for key in attribute)
+        if keep_dict:
+            return {attribute: attrs.get(attribute)}
+        return attrs[attribute]
+
+    def search(self, mbean):
+        return [name for name, _ in self.mbeans() if self.matches(mbean, name)]
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the Jolokia agent
+
+    def log_message(self, *args):
+        pass
+
+    def authorized(self):
+        if not self.server.credentials:
+            return True
+        expected = 'Basic ' + base64.b64encode(self.server.credentials.encode('utf-8')).decode('ascii')
+        return self.headers.get('Authorization') == expected
+
+    def reply(self, code, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def count(self, key):
+        with self.server.stats_lock:
+            self.server.stats[key] += 1
+
+    def handle_request(self, request):
+        self.count('jolokia_requests')
+        if self.server.error_rate and random.random() < self.server.error_rate:
+            return {'status': 500, 'error': 'simulated failure', 'error_type': 'java.lang.RuntimeException',
+                    'request': request}
+        broker = self.server.broker
+        if request.get('type') == 'search':
+            return {'status': 200, 'value': broker.search(request['mbean']), 'request': request,
+                    'timestamp': int(time.time())}
+        status, error_type, value = broker.read(request.get('mbean', ''), request.get('attribute'))
+        if status != 200:
+            return {'status': status, 'error_type': error_type, 'error': '%s : %s' % (error_type, value),
+                    'request': request}
+        return {'status': 200, 'value': value, 'request': request, 'timestamp': int(time.time())}
+
+    def begin(self):
+        self.count('http_requests')
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+    def do_GET(self):
+        if self.path == '/__stats':
+            with self.server.stats_lock:
+                return self.reply(200, dict(self.server.stats))
+        self.begin()
+        if not self.authorized():
+            return self.reply(401, {'error': 'unauthorized'})
+        if '/jolokia/search/' in self.path:
+            mbean = unquote(self.path.split('/jolokia/search/', 1)[1])
+            return self.reply(200, self.handle_request({'type': 'search', 'mbean': mbean}))
+        marker = '/jolokia/read/'
+        if marker not in self.path:
+            return self.reply(404, {'error': 'not found'})
+        mbean, _, attribute = unquote(self.path.split(marker, 1)[1]).partition('/')
+        request = {'type': 'read', 'mbean': mbean}
+        if attribute:
+            request['attribute'] = attribute.split(',') if ',' in attribute else attribute
+        self.reply(200, self.handle_request(request))
+
+    def do_POST(self):
+        self.begin()
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)).decode('utf-8'))
+        if not self.authorized():
+            return self.reply(401, {'error': 'unauthorized'})
+        if isinstance(body, list):
+            self.count('bulk_requests')
+            return self.reply(200, [self.handle_request(request) for request in body])
+        self.reply(200, self.handle_request(body))
+
+
+class Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # like a real agent, do not drop the connections of many concurrent reads
+
+
+def make_server(port=0, queues=100, latency=0.0, error_rate=0.0, credentials='admin:admin', broker='0.0.0.0'):
+    server = Server(('127.0.0.1', port), Handler)
+    server.broker = Broker(broker, queues)
+    server.latency = latency
+    server.error_rate = error_rate
+    server.credentials = credentials
+    server.stats_lock = threading.Lock()
+    server.stats = {'http_requests': 0, 'jolokia_requests': 0, 'bulk_requests': 0}
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8161)
+    parser.add_argument('--queues', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+    make_server(args.port, args.queues, args.latency, args.error_rate).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
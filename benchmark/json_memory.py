@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 *-*
+
+""" Compares the peak memory of decoding a large Jolokia bulk response at once
+    (json.loads, as load_json does) with decoding it incrementally (JsonStream).
+
+    Usage: benchmark/json_memory.py [--queues N]
+
+    Every variant runs in a fresh interpreter and reports the growth of its
+    peak resident set size while decoding the response and evaluating the
+    message counts. The result is printed as JSON. """
+
+import argparse
+import json
+import os
+import os.path as path
+import resource
+import subprocess
+import sys
+import tempfile
+
+ROOT = path.dirname(path.dirname(path.abspath(__file__)))
+MBEAN = ('org.apache.activemq.artemis:broker="0.0.0.0",component=addresses,address="%s",'
+         'subcomponent=queues,routing-type="anycast",queue="%s"')
+
+
+def write_response(filename, queues):
+    with open(filename, 'w') as response:
+        response.write('[')
+        for i in range(queues):
+            name = 'Queue.%06d' % i
+            response.write((',' if i else '') + json.dumps({
+                'request': {'mbean': MBEAN % (name, name), 'attribute': 'MessageCount', 'type': 'read'},
+                'value': i % 100, 'timestamp': 1500000000, 'status': 200}))
+        response.write(']')
+
+
+def peak_kb():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // (1024 if sys.platform == 'darwin' else 1)
+
+
+def measure(variant, filename):
+    sys.path.insert(0, ROOT)
+    import check_activemq
+
+    before = peak_kb()
+    with open(filename, 'rb') as response:
+        if variant == 'buffered':
+            counts = [r['value'] for r in json.loads(response.read().decode('utf-8'))]
+        else:
+            counts = [r['value'] for r in check_activemq.JsonStream(response.read).items()]
+    return {'variant': variant, 'queues': len(counts), 'peak_rss_growth_kb': peak_kb() - before}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--queues', type=int, default=50000)
+    parser.add_argument('--measure', choices=['buffered', 'streaming'], help=argparse.SUPPRESS)
+    parser.add_argument('--response', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.response)))
+        return
+
+    fd, filename = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    try:
+        write_response(filename, args.queues)
+        results = [json.loads(subprocess.check_output(
+            [sys.executable, __file__, '--measure', variant, '--response', filename]).decode('utf-8'))
+            for variant in ('buffered', 'streaming')]
+        buffered, streaming = [r['peak_rss_growth_kb'] for r in results]
+        print(json.dumps({'response_bytes': path.getsize(filename), 'results': results,
+                          'reduction': round(1 - float(streaming) / buffered, 3) if buffered else None},
+                         indent=2, sort_keys=True))
+    finally:
+        os.remove(filename)
+
+
+if __name__ == '__main__':
+    main()
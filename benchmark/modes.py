@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 *-*
+
+""" Times every mode of check_activemq.py end-to-end against a local fake Jolokia agent.
+
+    Usage: benchmark/modes.py [--queues N] [--latency SECONDS] [--error-rate RATE] [--repeat N]
+                              [--baseline FILE] [--tolerance FACTOR]
+
+    Every scenario runs the plugin --repeat times as a new process, like Nagios
+    does, so the wall times include the interpreter startup. For each scenario
+    the result lists the wall times, the peak resident set size of the plugin
+    process, its exit code and the number of HTTP, Jolokia and bulk requests
+    the fake agent received. The requests are those of the last run, when the
+    caches of the earlier runs are warm. The result is printed as JSON.
+
+    With --baseline, the result is compared with the JSON output of an earlier
+    run: the benchmark fails if a scenario needs more requests or its median
+    wall time grew by more than --tolerance. """
+
+import argparse
+import json
+import os
+import os.path as path
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from fake_jolokia import make_server
+
+ROOT = path.dirname(path.dirname(path.abspath(__file__)))
+PLUGIN = path.join(ROOT, 'check_activemq.py')
+
+QUEUE_MBEAN = ('org.apache.activemq.artemis:broker="0.0.0.0",component=addresses,address="Q.00001",'
+               'subcomponent=queues,routing-type="anycast",queue="Q.00001"')
+QUEUE_PATTERN_MBEAN = ('org.apache.activemq.artemis:broker="0.0.0.0",component=addresses,address=*,'
+                       'subcomponent=queues,routing-type="anycast",queue="Q.0001*"')
+
+SCENARIOS = [
+    ('startup', ['--version']),
+    ('queue_size', ['queue_size', '-w', '1000', '-c', '2000']),
+    ('queue_size_top', ['queue_size', '--top', '10', '-w', '1000', '-c', '2000']),
+    ('queue_size_threads', ['--chunk-size', '0', 'queue_size', '--parallel', '50', '-w', '1000', '-c', '2000']),
+    ('queue_size_asyncio', ['--chunk-size', '0', 'queue_size', '--parallel', '50', '--engine', 'asyncio',
+                            '-w', '1000', '-c', '2000']),
+    ('queue_size_wildcard', ['queue_size', 'Q.0001*', '-w', '1000', '-c', '2000']),
+    ('queue_size_server_filter', ['queue_size', 'Q.0001*', '--server-filter', '-w', '1000', '-c', '2000']),
+    ('queue_rate', ['queue_rate', 'Q.0001*']),
+    ('consumer_health', ['consumer_health', '-w', '1000', '-c', '2000']),
+    ('exists', ['exists', '--queue', 'Q.00001']),
+    ('exists_pattern', ['exists', '--queue', 'Q.0001*']),
+    ('broker_property', ['broker_property', '--property', 'AddressMemoryUsagePercentage']),
+    ('query_object', ['query_object', QUEUE_MBEAN + '/MessageCount', '-w', '1000', '-c', '2000']),
+    ('query_object_pattern', ['query_object', QUEUE_PATTERN_MBEAN + '/MessageCount', '-w', '1000', '-c', '2000']),
+    ('health', ['health']),
+    ('dlq_expiry_check', ['dlq_expiry_check', '--address', 'DLQ', '--address', 'ExpiryQueue']),
+]
+
+
+def peak_kb(rusage):
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return rusage.ru_maxrss // (1024 if sys.platform == 'darwin' else 1)
+
+
+def run_plugin(argv):
+    """Runs the plugin once and returns its wall time, exit code, peak RSS and first output line."""
+    with tempfile.TemporaryFile() as output, open(os.devnull, 'wb') as devnull:
+        start = time.time()
+        process = subprocess.Popen([sys.executable, PLUGIN] + argv, stdout=output, stderr=devnull)
+        _, status, rusage = os.wait4(process.pid, 0)
+        wall = time.time() - start
+        process.returncode = os.WEXITSTATUS(status)  # already reaped
+        output.seek(0)
+        first_line = output.read().decode('utf-8', 'replace').partition('\n')[0]
+    return wall, os.WEXITSTATUS(status), peak_kb(rusage), first_line
+
+
+def stats(server):
+    with server.stats_lock:
+        return dict(server.stats)
+
+
+def run_scenario(server, cache_dir, name, argv, repeat):
+    if argv != ['--version']:
+        argv = ['--port', str(server.server_address[1]), '--cache_dir', cache_dir] + argv
+    walls = []
+    for _ in range(repeat):
+        before = stats(server)
+        wall, exit_code, rss_kb, first_line = run_plugin(argv)
+        walls.append(wall)
+        after = stats(server)
+    walls.sort()
+    result = {'name': name, 'argv': argv, 'exit_code': exit_code, 'output': first_line[:200],
+              'wall_ms': {'min': round(walls[0] * 1000, 1), 'median': round(walls[len(walls) // 2] * 1000, 1),
+                          'max': round(walls[-1] * 1000, 1)},
+              'peak_rss_kb': rss_kb}
+    for key in after:
+        result[key] = after[key] - before[key]
+    return result
+
+
+def regressions(results, baseline, tolerance):
+    old = dict((result['name'], result) for result in baseline['results'])
+    found = []
+    for result in results:
+        previous = old.get(result['name'])
+        if previous is None:
+            continue
+        for key in ('http_requests', 'jolokia_requests'):
+            if result[key] > previous[key]:
+                found.append('%s: %s %s -> %s' % (result['name'], key, previous[key], result[key]))
+        if result['wall_ms']['median'] > previous['wall_ms']['median'] * tolerance:
+            found.append('%s: median wall time %sms -> %sms' % (
+                result['name'], previous['wall_ms']['median'], result['wall_ms']['median']))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--queues', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.0, help='Delay of every HTTP request in seconds.')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Probability of a failing read.')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--baseline', help='JSON output of an earlier run to compare with.')
+    parser.add_argument('--tolerance', type=float, default=1.5,
+                        help='Allowed growth factor of the median wall times. (default: %(default)s)')
+    args = parser.parse_args()
+
+    server = make_server(queues=args.queues, latency=args.latency, error_rate=args.error_rate)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    cache_dir = tempfile.mkdtemp()
+    try:
+        results = [run_scenario(server, cache_dir, name, argv, args.repeat) for name, argv in SCENARIOS]
+    finally:
+        server.shutdown()
+        shutil.rmtree(cache_dir)
+
+    report = {'python': platform.python_version(), 'queues': args.queues, 'latency': args.latency,
+              'error_rate': args.error_rate, 'repeat': args.repeat, 'results': results}
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            report['regressions'] = regressions(results, json.load(baseline), args.tolerance)
+    print(json.dumps(report, indent=2, sort_keys=True))
+    if report.get('regressions'):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
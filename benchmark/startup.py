@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 *-*
+
+""" Checks the start-up time of check_activemq.py against a budget.
+
+    Usage: benchmark/startup.py [--repeat N] [--budget MS] [--mode MODE]
+
+    Nagios starts the plugin for every check, so the time until it sends its
+    first request is paid on every run. This measures in fresh interpreters
+    how long importing the plugin and parsing the arguments of --mode takes,
+    compared with importing only the modules it cannot do without (the
+    interpreter, nagiosplugin, the HTTP client, argparse and json). It fails
+    if the median difference exceeds --budget milliseconds, or if the modules
+    only other modes need were imported. The result is printed as JSON.
+
+    The plugin is imported from its cached bytecode, like with "python -m
+    check_activemq". Started as a script, Python compiles it on every run;
+    script_ms is the time this takes on top. """
+
+import argparse
+import json
+import os
+import os.path as path
+import platform
+import subprocess
+import sys
+import timeit
+
+ROOT = path.dirname(path.dirname(path.abspath(__file__)))
+
+# modules only some modes need, which must not slow down the start of the others
+LAZY_MODULES = ['tempfile', 'hashlib', 'copy', 'heapq', 'queue', 'Queue', 'asyncio', 'check_activemq_async',
+                'socketserver', 'SocketServer', 'http.server', 'BaseHTTPServer', 'cProfile']
+
+DEPENDENCIES = """
+import argparse, json, logging, nagiosplugin
+try:
+    import httplib
+except ImportError:
+    import http.client
+"""
+
+PLUGIN = """
+import check_activemq
+args = check_activemq.build_parser(mode=check_activemq.selected_mode(%(argv)r)).parse_args(%(argv)r)
+"""
+
+TIMED = """
+import sys, time
+start = time.time()
+%s
+elapsed = time.time() - start
+print(repr((elapsed, sorted(sys.modules))))
+"""
+
+
+def measure(code):
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)  # the first run caches the bytecode of the plugin
+    output = subprocess.check_output([sys.executable, '-c', TIMED % code], cwd=ROOT, env=env)
+    return eval(output.decode('utf-8'))
+
+
+def compile_time():
+    with open(path.join(ROOT, 'check_activemq.py')) as source:
+        code = source.read()
+    times = []
+    for _ in range(5):
+        start = timeit.default_timer()
+        compile(code, 'check_activemq.py', 'exec')
+        times.append(timeit.default_timer() - start)
+    return min(times)
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=21)
+    parser.add_argument('--budget', type=float, default=10.0,
+                        help='Allowed start-up time of the plugin itself in milliseconds. (default: %(default)s)')
+    parser.add_argument('--mode', default='health', help='Arguments of the check to parse. (default: %(default)s)')
+    args = parser.parse_args()
+
+    argv = args.mode.split()
+    dependencies, plugin = [], []
+    measure(PLUGIN % {'argv': argv})
+    for _ in range(args.repeat):  # interleaved, so both see the same load of the machine
+        elapsed, required = measure(DEPENDENCIES)
+        dependencies.append(elapsed)
+        elapsed, modules = measure(PLUGIN % {'argv': argv})
+        plugin.append(elapsed)
+
+    overhead_ms = (median(plugin) - median(dependencies)) * 1000
+    report = {'python': platform.python_version(), 'mode': args.mode, 'repeat': args.repeat,
+              'dependencies_ms': round(median(dependencies) * 1000, 2), 'plugin_ms': round(median(plugin) * 1000, 2),
+              'overhead_ms': round(overhead_ms, 2), 'budget_ms': args.budget,
+              'script_ms': round(compile_time() * 1000, 2),
+              'lazy_modules_imported': [module for module in LAZY_MODULES
+                                        if module in modules and module not in required]}
+    report['ok'] = overhead_ms <= args.budget and not report['lazy_modules_imported']
+    print(json.dumps(report, indent=2, sort_keys=True))
+    if not report['ok']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
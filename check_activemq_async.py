@@ -0,0 +1,194 @@
+# -*- coding: utf-8 *-*
+
+"""	Copyright 2015 predic8 GmbH, www.predic8.com
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License. """
+
+""" Asyncio engine for the concurrent reads of check_activemq.py (Python 3.5+).
+
+    check_activemq.py only imports this module for --engine asyncio. A single
+    thread drives all requests: they share keep-alive connections per agent,
+    at most --parallel of them are in flight at once and every one ends at its
+    own deadline. The responses are returned in the order of the URLs, so the
+    nagiosplugin contexts evaluate them like those of the threaded engine.
+    Only the standard library is imported. """
+
+import asyncio
+import base64
+import json
+import ssl
+import time
+from urllib.parse import urlsplit
+
+
+class Pool(object):
+    """Keep-alive HTTP/1.1 connections to Jolokia agents, shared by all requests of a run.
+
+    ``auth`` is the Authorization header of the check, like the one given to
+    the blocking HttpPool; credentials embedded in a URL take precedence."""
+
+    def __init__(self, limit, auth=None, timings=None):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.idle = {}
+        self.auth = auth
+        self.timings = timings
+        self.ssl_context = None
+
+    def count(self, counter):
+        if self.timings is not None:
+            self.timings.count(counter)
+
+    async def connect(self, scheme, host, port):
+        self.count('connections')
+        if scheme != 'https':
+            return await asyncio.open_connection(host, port or 80)
+        if self.ssl_context is None:
+            self.ssl_context = ssl.create_default_context()
+        return await asyncio.open_connection(host, port or 443, ssl=self.ssl_context)
+
+    def close(self):
+        idle, self.idle = self.idle, {}
+        for connections in idle.values():
+            for _, writer in connections:
+                writer.close()
+
+    async def request(self, url, data=None):
+        """Sends a request and returns the status, reason and body of the response."""
+        parts = urlsplit(url)
+        key = (parts.scheme or 'http', parts.hostname, parts.port)
+        headers = ['Host: ' + parts.netloc.rpartition('@')[2], 'Accept: application/json']
+        if parts.username is not None:
+            headers.append('Authorization: ' + basic_auth(parts.username, parts.password or ''))
+        elif self.auth is not None:
+            headers.append('Authorization: ' + self.auth)
+        body = b''
+        if data is not None:
+            body = data.encode('utf-8')
+            headers += ['Content-Type: application/json', 'Content-Length: %d' % len(body)]
+        target = (parts.path or '/') + ('?' + parts.query if parts.query else '')
+        message = ('%s %s HTTP/1.1\r\n%s\r\n\r\n' % ('GET' if data is None else 'POST', target,
+                                                     '\r\n'.join(headers))).encode('latin-1') + body
+
+        self.count('http_requests')
+        while True:
+            connections = self.idle.get(key)
+            reused = bool(connections)
+            reader, writer = connections.pop() if reused else await self.connect(*key)
+            try:
+                writer.write(message)
+                status, reason, body, reusable = await read_response(reader)
+            except asyncio.CancelledError:
+                writer.close()  # the response may still arrive, the connection cannot be used again
+                raise
+            except (OSError, EOFError, ValueError) as e:
+                writer.close()
+                if reused and not isinstance(e, ValueError):
+                    # the agent closed the idle connection, try again on a fresh one
+                    continue
+                raise IOError('HTTP request failed: %r' % e)
+            if reusable:
+                self.idle.setdefault(key, []).append((reader, writer))
+            else:
+                writer.close()
+            return status, reason, body
+
+
+def basic_auth(user, pwd):
+    return 'Basic ' + base64.b64encode((user + ':' + pwd).encode('utf-8')).decode('ascii')
+
+
+async def read_response(reader):
+    """Reads an HTTP/1.x response and returns its status, reason, body and if the connection can be reused."""
+    line = await reader.readline()
+    if not line:
+        raise EOFError('connection closed by the agent')
+    version, status, reason = (line.decode('latin-1').rstrip('\r\n').split(' ', 2) + [''])[:3]
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    reusable = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            if not size:
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass  # trailers
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+        body = b''.join(chunks)
+    elif 'content-length' in headers:
+        body = await reader.readexactly(int(headers['content-length']))
+    else:
+        body = await reader.read()
+        reusable = False
+    return int(status), reason, body, reusable
+
+
+async def load_json(pool, url, deadline=None, timeout=None):
+    # the time limit only starts when the request is sent, not while it waits for its turn
+    async with pool.semaphore:
+        limits = [t for t in (timeout, None if deadline is None else deadline - time.time()) if t is not None]
+        if limits and min(limits) <= 0:
+            raise asyncio.TimeoutError()
+        status, reason, body = await asyncio.wait_for(pool.request(url), min(limits) if limits else None)
+    try:
+        return json.loads(body.decode('utf-8'))
+    except ValueError:
+        if status >= 400:  # e.g. an HTML error page for wrong credentials
+            raise IOError('HTTP Error %s: %s' % (status, reason))
+        raise
+
+
+async def load_all(urls, limit, deadline, timeout, auth, timings, deadline_exceeded):
+    pool = Pool(limit, auth, timings)
+
+    async def load(url):
+        if timings is not None:
+            timings.count('jolokia_reads')
+        try:
+            return await load_json(pool, url, deadline, timeout), None
+        except asyncio.TimeoutError:
+            if deadline is not None and time.time() >= deadline:
+                return None, deadline_exceeded('skipped, check timeout exceeded')
+            return None, IOError('timed out')
+        except (IOError, ValueError) as e:
+            return None, e
+
+    try:
+        return await asyncio.gather(*[load(url) for url in urls])
+    finally:
+        pool.close()
+
+
+def load_json_parallel(urls, limit, deadline=None, timeout=None, auth=None, timings=None,
+                       deadline_exceeded=IOError):
+    """Reads the URLs with up to ``limit`` concurrent requests from one thread.
+
+    Returns one ``(response, error)`` tuple per URL in the order of the URLs.
+    Each request may take at most ``timeout`` seconds and never longer than
+    the time left until ``deadline``; requests cut off by the deadline get a
+    ``deadline_exceeded`` error. ``auth`` is the Authorization header to
+    send. ``timings`` (a check_activemq.Timings) counts the requests and
+    connections."""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(load_all(urls, limit, deadline, timeout, auth, timings, deadline_exceeded))
+    finally:
+        loop.close()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 *-*
+
+"""	Copyright 2015 predic8 GmbH, www.predic8.com
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License. """
+
+""" Client for the serve mode of check_activemq.py.
+
+    Usage: check_activemq_client.py [--socket PATH | --server [HOST:]PORT] CHECK_ACTIVEMQ_ARGS...
+
+    Sends the arguments to a running "check_activemq.py serve" and prints its
+    output and exits with its exit code, exactly like check_activemq.py would.
+    If no server is reachable, check_activemq.py is executed directly instead.
+    Only the standard library is imported to keep the start-up time minimal. """
+
+import json
+import os
+import os.path as path
+import socket
+import sys
+
+DEFAULT_SOCKET = '~/.cache/activemq-nagios-plugin/check.sock'
+
+
+def connect(option, address):
+    if option == '--server':
+        host, _, port = address.rpartition(':')
+        return socket.create_connection((host or 'localhost', int(port)))
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(path.expanduser(address))
+    return sock
+
+
+def main(argv):
+    option, address = '--socket', DEFAULT_SOCKET
+    if argv[:1] in (['--socket'], ['--server']) and len(argv) > 1:
+        option, address, argv = argv[0], argv[1], argv[2:]
+
+    try:
+        sock = connect(option, address)
+    except (socket.error, ValueError):
+        plugin = path.join(path.dirname(path.abspath(__file__)), 'check_activemq.py')
+        os.execv(sys.executable, [sys.executable, plugin] + argv)
+
+    timeout = int(os.environ.get('TIMEOUT', 10))
+    sock.settimeout(timeout + 5 if timeout else None)
+    try:
+        sock.sendall((json.dumps({'argv': argv}) + '\n').encode('utf-8'))
+        response = json.loads(sock.makefile('rb').readline().decode('utf-8'))
+    except (socket.error, ValueError) as e:
+        sys.stdout.write('UNKNOWN: check server failed: %s\n' % e)
+        return 3
+    finally:
+        sock.close()
+
+    sys.stdout.write(response['output'].encode('utf-8') if sys.version_info[0] < 3 else response['output'])
+    return response['exitcode']
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
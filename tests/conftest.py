@@ -0,0 +1,44 @@
+import os
+import sys
+import threading
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'benchmark')]
+
+import check_activemq  # noqa: E402
+import fake_jolokia  # noqa: E402
+
+
+@pytest.fixture
+def agent():
+    """A fake Jolokia agent with 30 queues, served from a thread of the test process."""
+    server = fake_jolokia.make_server(queues=30)
+    server.handle_error = lambda request, client_address: None  # checks hang up on reads they gave up
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05})
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def parse(agent, tmpdir):
+    """Parses the arguments of a plugin run against the ``agent`` like main() does."""
+    def parse(*argv):
+        argv = ['--port', str(agent.server_address[1]), '--host', '127.0.0.1', '--cache_dir', str(tmpdir)] + list(argv)
+        args = check_activemq.build_parser(mode=check_activemq.selected_mode(argv)).parse_args(argv)
+        check_activemq.authorize(args)
+        return args
+    return parse
+
+
+@pytest.fixture
+def served(agent):
+    """Returns the number of HTTP, Jolokia and bulk requests the ``agent`` served so far."""
+    def served():
+        with agent.stats_lock:
+            return dict(agent.stats)
+    return served
@@ -0,0 +1,45 @@
+"""Tests of the batch mode against a fake Jolokia agent."""
+
+import check_activemq
+
+
+def run_batch(parse, *entries):
+    args = parse('batch', 'spec.json')
+    spec = {'checks': [{'service': str(i), 'args': list(entry)} for i, entry in enumerate(entries)]}
+    return [(exitcode, output) for _, _, exitcode, output in check_activemq.run_spec_checks(args, spec)]
+
+
+def test_batch_bulk_reads(parse, served):
+    results = run_batch(parse, ['queue_size', '-w', '100', '-c', '200'], ['health'])
+    assert [exitcode for exitcode, _ in results] == [0, 0]
+    assert 'Checked 32 queues' in results[0][1] and 'status True' in results[1][1]
+    assert served()['http_requests'] == 2
+
+
+def test_batch_parallel_reads_prefetched(parse, served):
+    results = run_batch(parse, ['--chunk-size', '0', 'queue_size', 'Q.0001*', '--parallel', '4'])
+    assert results[0][0] == 2 and "'Q.00019'=19" in results[0][1]
+    assert served()['http_requests'] == 2
+
+
+def test_batch_cluster_reads_prefetched(parse, served, agent):
+    node = '127.0.0.1:%d' % agent.server_address[1]
+    results = run_batch(parse, ['cluster_queue_size', '--node', node, '-w', '100', '-c', '200'])
+    assert results[0][0] == 0 and 'Checked 32 queues on 1 of 1 nodes' in results[0][1]
+    assert served()['http_requests'] == 2
+
+
+def test_batch_cluster_reads_other_agents(parse, served, agent):
+    node = 'localhost:%d' % agent.server_address[1]  # not the agent of the batch, so read by the check itself
+    results = run_batch(parse, ['cluster_queue_size', '--node', node, '-w', '100', '-c', '200'], ['health'])
+    assert [exitcode for exitcode, _ in results] == [0, 0]
+    assert served() == {'http_requests': 3, 'jolokia_requests': 2 + 32, 'bulk_requests': 2}
+
+
+def test_batch_invalid_entries(parse):
+    results = run_batch(parse, ['--port', 'abc', 'health'], ['--version'], ['health', '-h'], ['batch', 'x'], ['health'])
+    assert [exitcode for exitcode, _ in results] == [3, 3, 3, 3, 0]
+    assert "invalid int value: 'abc'" in results[0][1]
+    assert 'version %s' % check_activemq.PLUGIN_VERSION in results[1][1]
+    assert 'usage:' in results[2][1]
+    assert 'cannot be nested' in results[3][1]
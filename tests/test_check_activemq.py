@@ -0,0 +1,272 @@
+"""Tests of the parts of check_activemq that work without a broker.
+
+Run them with ``python -m pytest tests`` from the repository root."""
+
+import argparse
+import io
+import json
+import os
+import time
+
+import pytest
+
+import check_activemq
+
+
+def make_args(tmpdir, broker='localhost'):
+    return argparse.Namespace(cache_dir=str(tmpdir), broker=broker, jolokia_url='http://localhost:8161/api/jolokia/',
+                              debug=False, state_prefix='')
+
+
+DOCUMENT = {
+    'status': 200,
+    'timestamp': 1700000000,
+    'value': {
+        u'org.apache.activemq.artemis:broker="0",component=addresses,address="TEST.ä"': {
+            'MessageCount': 12345678901234567890,
+            'Paused': False,
+            'Ratio': -1.5e-3,
+            'Names': ['a', 'b \\"c\\"', u'€'],
+            'Empty': {},
+            'None': None,
+        },
+        'another': {'Nested': [[], [1, [2, {}]], {'x': [3]}]},
+    },
+}
+
+
+def chunked(data, size):
+    # a read function handing out at most ``size`` bytes, like a response read in small pieces
+    stream = io.BytesIO(data)
+    return lambda _: stream.read(size)
+
+
+def read_document(stream):
+    result = {}
+    for key in stream.members():
+        if key == 'value':
+            result[key] = dict((name, stream.value()) for name in stream.members())
+        else:
+            result[key] = stream.value()
+    return result
+
+
+@pytest.mark.parametrize('size', range(1, 8))
+def test_json_stream_round_trip(size):
+    data = json.dumps(DOCUMENT, indent=1, ensure_ascii=False).encode('utf-8')
+    with check_activemq.JsonStream(chunked(data, size), chunk_size=size) as stream:
+        assert read_document(stream) == DOCUMENT
+
+
+@pytest.mark.parametrize('size', range(1, 8))
+def test_json_stream_items(size):
+    responses = [{'status': 200, 'value': 1}, {'status': 404, 'error': 'not found'}, 17, [], {}, 'x']
+    data = b' [ ' + json.dumps(responses).encode('utf-8')[1:] + b' \n'
+    with check_activemq.JsonStream(chunked(data, size), chunk_size=size) as stream:
+        assert stream.peek() == '['
+        assert list(stream.items()) == responses
+
+
+@pytest.mark.parametrize('size', range(1, 8))
+def test_json_stream_numbers(size):
+    # numbers split at every offset, a prefix like 1. or 1e is no complete number
+    data = b'[1.5, 2, 1e5, -1.5e-3, 12345678901234567890, 1E+2, -0, 0.25]'
+    with check_activemq.JsonStream(chunked(data, size), chunk_size=size) as stream:
+        assert list(stream.items()) == [1.5, 2, 1e5, -1.5e-3, 12345678901234567890, 100.0, 0, 0.25]
+    assert check_activemq.JsonStream(chunked(b'-12.5', size), chunk_size=size).value() == -12.5
+
+
+def test_json_stream_empty_containers():
+    stream = check_activemq.JsonStream(chunked(b'{"value": [], "other": {}}', 3))
+    assert [(key, list(stream.items()) if key == 'value' else list(stream.members()))
+            for key in stream.members()] == [('value', []), ('other', [])]
+
+
+def test_json_stream_truncated():
+    stream = check_activemq.JsonStream(chunked(b'[{"status": 200}, {"stat', 4))
+    with pytest.raises(ValueError):
+        list(stream.items())
+
+
+def test_json_stream_drains_and_releases():
+    released = []
+    stream = check_activemq.JsonStream(chunked(b'{"value": [1, 2, 3], "status": 200}', 2), released.append, 2)
+    with stream:
+        assert next(stream.members()) == 'value'
+    assert stream.eof and released == [True]
+
+
+def test_read_request():
+    prefix = 'http://localhost:8161/api/jolokia/read/'
+    assert check_activemq.read_request(prefix, prefix + 'org.apache.activemq.artemis:broker=%220%22/AddressNames') == {
+        'type': 'read', 'mbean': 'org.apache.activemq.artemis:broker="0"', 'attribute': 'AddressNames'}
+    assert check_activemq.read_request(prefix, prefix + 'bean:name=x/MessageCount,ConsumerCount') == {
+        'type': 'read', 'mbean': 'bean:name=x', 'attribute': ['MessageCount', 'ConsumerCount']}
+    assert check_activemq.read_request(prefix, prefix + 'bean:name=x/Attribute/inner/path') == {
+        'type': 'read', 'mbean': 'bean:name=x', 'attribute': 'Attribute', 'path': 'inner/path'}
+    assert check_activemq.read_request(prefix, prefix + 'bean:name=*', prefix[:-5] + 'search/') == {
+        'type': 'read', 'mbean': 'bean:name=*'}
+    search = 'http://localhost:8161/api/jolokia/search/'
+    assert check_activemq.read_request(prefix, search + 'bean:name=*', search) == {
+        'type': 'search', 'mbean': 'bean:name=*'}
+
+
+@pytest.mark.parametrize('argv, message', [
+    (['--port', 'abc', 'health'], "argument --port: invalid int value: 'abc'"),
+    (['--version'], 'version %s' % check_activemq.PLUGIN_VERSION),
+    (['health', '--help'], 'usage:'),
+    (['queue_size', '--top', '0'], 'argument --top'),
+    (['no_such_mode'], 'invalid choice'),
+])
+def test_run_check_invalid_arguments(argv, message, capsys):
+    exitcode, output = check_activemq.run_check(argv)
+    assert exitcode == 3 and output.startswith('UNKNOWN: ValueError: ') and message in output
+    assert capsys.readouterr() == ('', '')  # nothing printed by the process itself
+
+
+def test_state_store(tmpdir):
+    args = make_args(tmpdir)
+    store = check_activemq.StateStore(args, 'consumers')
+    assert store.get('A') is None and store.get('A', 0) == 0
+    store.put('A', {'count': 1})
+    store.put('B', 2)
+    store.save()
+
+    concurrent = check_activemq.StateStore(args, 'consumers')
+    assert concurrent.get('A') == {'count': 1} and concurrent.get('B') == 2
+    concurrent.put('C', 3)
+    store.remove('B')
+    store.save()
+    concurrent.save()  # merges its own changes only, keeping the removal
+    assert sorted(check_activemq.StateStore(args, 'consumers').entries) == ['A', 'C']
+    assert check_activemq.StateStore(make_args(tmpdir, 'other'), 'consumers').entries == {}
+
+
+def test_state_store_evicts(tmpdir):
+    args = make_args(tmpdir)
+    store = check_activemq.StateStore(args, 'consumers', max_age=60)
+    store.put('old', 1)
+    store.put('new', 2)
+    store.entries['old'][0] = time.time() - 120
+    store.save()
+    assert sorted(check_activemq.StateStore(args, 'consumers').entries) == ['new']
+
+
+def test_state_store_ignores_broken_file(tmpdir):
+    args = make_args(tmpdir)
+    store = check_activemq.StateStore(args, 'consumers')
+    check_activemq.make_dirs(os.path.dirname(store.filename))
+    with open(store.filename, 'wb') as storefile:
+        storefile.write(b'[1, 2')
+    assert check_activemq.StateStore(args, 'consumers').entries == {}
+
+
+def test_sample_store(tmpdir):
+    args = make_args(tmpdir)
+    now = time.time()
+    store = check_activemq.SampleStore(args, 'samples', 4, capacity=3)
+    for i in range(5):
+        store.add(u'Q.ä', (now - 50 + i, i, 10 * i, 5 * i))
+    store.add('R', (now, 1, 2, 3))
+    store.save()
+
+    loaded = check_activemq.SampleStore(args, 'samples', 4, capacity=3)
+    assert loaded.history(u'Q.ä') == [(now - 48 + i, 2 + i, 20 + 10 * i, 10 + 5 * i) for i in range(3)]
+    assert loaded.history('R') == [(now, 1, 2, 3)]
+    assert loaded.history('unknown') == []
+
+
+def test_sample_store_merges(tmpdir):
+    args = make_args(tmpdir)
+    now = time.time()
+    first = check_activemq.SampleStore(args, 'samples', 2)
+    second = check_activemq.SampleStore(args, 'samples', 2)
+    first.add('A', (now, 1))
+    second.add('B', (now - 120, 2))
+    first.save()
+    second.save()  # written concurrently, must not drop the samples of A
+
+    third = check_activemq.SampleStore(args, 'samples', 2, max_age=60)
+    assert third.history('A') == [(now, 1)] and third.history('B') == [(now - 120, 2)]
+    third.add('A', (now + 1, 3))
+    third.save()  # B is older than max_age
+    assert list(check_activemq.SampleStore(args, 'samples', 2).samples) == ['A']
+
+
+def test_sample_store_truncated(tmpdir):
+    args = make_args(tmpdir)
+    store = check_activemq.SampleStore(args, 'samples', 2)
+    store.add('A', (time.time(), 1))
+    store.add('B', (time.time(), 2))
+    store.save()
+    with open(store.filename, 'rb') as storefile:
+        data = storefile.read()
+    with open(store.filename, 'wb') as storefile:
+        storefile.write(data[:-4])
+    assert list(check_activemq.SampleStore(args, 'samples', 2).samples) == ['A']
+
+
+def test_queue_selector():
+    selector = check_activemq.QueueSelector(['ORDERS', 'TEST.*'], ['(?i:dlq\\.[0-9]+)'], ['TEST.skip'], ['.*\\.tmp'])
+    names = ['ORDERS', 'ORDERS2', 'TEST.a', 'TEST.skip', 'TEST.b.tmp', 'DLQ.1', 'dlq.12x', 'activemq.management']
+    assert selector.select(names) == ['ORDERS', 'TEST.a', 'DLQ.1']
+    assert selector.include_names == {'ORDERS'}
+    assert selector.jmx_pattern() is None
+
+    assert check_activemq.QueueSelector().select(names) == names[:-1]
+    assert check_activemq.QueueSelector().jmx_pattern() == '*'
+    assert check_activemq.QueueSelector(['TEST.*']).jmx_pattern() == 'TEST.*'
+    assert check_activemq.QueueSelector(include_regex=['TEST']).select(['TEST', 'TEST.a']) == ['TEST']
+
+
+def test_queue_selector_groups():
+    # every expression is matched on its own, so group names and numbers never clash
+    selector = check_activemq.QueueSelector(include_regex=['(?P<n>A)', '(?P<n>B)', '(x)', '(a)\\1'],
+                                            exclude_regex=['(?P<n>B)', '(?P<n>C)'])
+    assert selector.select(['A', 'B', 'C', 'x', 'aa', 'ab']) == ['A', 'x', 'aa']
+    args = check_activemq.build_parser(mode='queue_size').parse_args(
+        ['queue_size', '--include-regex', '(?P<n>A)', '--include-regex', '(?P<n>B)'])
+    assert check_activemq.queue_selector(args).select(['A', 'B', 'C']) == ['A', 'B']
+
+
+def test_queue_regex():
+    assert check_activemq.queue_regex('A|B') == 'A|B'
+    assert check_activemq.queue_regex('\\(?i\\)') == '\\(?i\\)'
+    for value in ['(?i)orders', '[unclosed', 'a)|(b']:
+        with pytest.raises(argparse.ArgumentTypeError):
+            check_activemq.queue_regex(value)
+
+
+def test_queue_stats_percentile():
+    stats = check_activemq.QueueStats(k=2)
+    sizes = list(range(1000))
+    for size in sizes:
+        stats.add('Q%d' % size, size)
+    assert (stats.count, stats.min, stats.max, stats.average()) == (1000, 0, 999, 499.5)
+    for percent in (1, 10, 50, 90, 99):
+        exact = sizes[int(len(sizes) * percent / 100.0) - 1]
+        assert exact <= stats.percentile(percent) <= max(1, exact * 1.19)
+    assert stats.percentile(100) == 999
+    assert stats.deepest() == [(999, 'Q999'), (998, 'Q998')]
+
+
+def test_queue_stats_single_queue():
+    stats = check_activemq.QueueStats()
+    stats.add('Q', 0)
+    assert stats.percentile(50) == 0 and stats.deepest() == []
+
+
+def test_queue_rates():
+    samples = [(60 * i, 10 + 2 * i, 100 + 30 * i, 100 + 28 * i) for i in range(5)]
+    enqueue, dequeue, growth = check_activemq.queue_rates(samples, 3600)
+    assert (enqueue, dequeue) == (30, 28) and abs(growth - 2) < 1e-9
+    assert check_activemq.queue_rates(samples[:1], 3600) is None
+    enqueue, _, _ = check_activemq.queue_rates(samples + [(300, 20, 500, 400)], 90)  # only the last two
+    assert enqueue == 280
+
+
+def test_queue_rates_after_restart():
+    samples = [(0, 5, 1000, 990), (60, 6, 1060, 1049), (120, 0, 10, 5), (180, 3, 40, 32)]
+    enqueue, dequeue, growth = check_activemq.queue_rates(samples, 3600)
+    assert (enqueue, dequeue, growth) == (30, 27, 3)
+    assert check_activemq.queue_rates(samples[:3], 3600) is None
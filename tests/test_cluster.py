@@ -0,0 +1,37 @@
+"""Tests of cluster_queue_size against fake Jolokia agents."""
+
+import check_activemq
+
+
+def run_cluster(agent, tmpdir, *options):
+    port = agent.server_address[1]
+    return check_activemq.run_check(['--port', str(port), '--cache_dir', str(tmpdir)] + list(options) + [
+        'cluster_queue_size', '--node', '127.0.0.1:%d' % port, '-w', '100', '-c', '200'])
+
+
+def test_cluster_queue_size(agent, tmpdir):
+    exitcode, output = run_cluster(agent, tmpdir)
+    assert exitcode == 0 and output.startswith('ACTIVEMQCLUSTERQUEUESIZE OK - Checked 32 queues on 1 of 1 nodes')
+
+
+def test_cluster_failed_reads_unknown(agent, monkeypatch, tmpdir):
+    read = agent.broker.read
+
+    def failing(mbean, attribute=None):
+        if 'queue="Q.00003"' in mbean:
+            return 500, 'java.lang.RuntimeException', 'simulated failure'
+        return read(mbean, attribute)
+    monkeypatch.setattr(agent.broker, 'read', failing)
+
+    exitcode, output = run_cluster(agent, tmpdir)
+    assert exitcode == 3
+    assert 'Fetching 1 queues of 127.0.0.1:%d FAILED: Q.00003: ' % agent.server_address[1] in output
+    assert "'Queue Size of Q.00004'=4" in output and "'Queue Size of Q.00003'" not in output
+
+
+def test_cluster_skipped_queues(agent, monkeypatch, tmpdir):
+    monkeypatch.setenv('TIMEOUT', '2')  # the reads have to finish within a second
+    agent.latency = 0.3
+    exitcode, output = run_cluster(agent, tmpdir, '--chunk-size', '4')
+    assert exitcode == 3 and '1 of 1 nodes' not in output
+    assert 'skipped' in output and '@127.0.0.1:%d' % agent.server_address[1] in output
@@ -0,0 +1,64 @@
+"""Tests of the OpenMetrics text format of the exporter against a fake Jolokia agent."""
+
+import os
+import re
+
+import check_activemq
+
+
+def families(text):
+    # the samples of every metric family, in the order of the text
+    result, family = [], None
+    for line in text.splitlines():
+        if line.startswith('# TYPE '):
+            family = line.split()[2]
+            result.append((family, []))
+        elif not line.startswith('#'):
+            assert line.startswith(family)
+            result[-1][1].append(line)
+    return result
+
+
+def test_openmetrics(parse, agent, monkeypatch):
+    read = agent.broker.read
+
+    def failing(mbean, attribute=None):
+        if 'queue="Q.00003"' in mbean:
+            return 500, 'java.lang.RuntimeException', 'simulated failure'
+        return read(mbean, attribute)
+    monkeypatch.setattr(agent.broker, 'read', failing)
+
+    spec = {'checks': [{'service': 'health', 'args': ['health']},
+                       {'service': 'queues "all"\\\n', 'args': ['queue_size', 'Q.0000*']},
+                       {'service': 'broken', 'args': ['no_such_mode']}]}
+    text = check_activemq.openmetrics(check_activemq.run_spec_checks(parse('exporter'), spec), 1700000000.5, 0.25)
+
+    assert text.endswith('\n# EOF\n') and text.count('# EOF') == 1
+    assert [family for family, _ in families(text)] == [
+        'activemq_check_status', 'activemq_collect_duration_seconds', 'activemq_collect_time_seconds',
+        'activemq_queue_size']
+    assert '# HELP activemq_check_status Nagios state of the check: 0 OK' in text
+    samples = dict(families(text))
+    assert samples['activemq_check_status'] == [
+        'activemq_check_status{service="health"} 0.0',
+        'activemq_check_status{service="queues \\"all\\"\\\\\\n"} 3.0',
+        'activemq_check_status{service="broken"} 3.0']
+    assert samples['activemq_collect_duration_seconds'] == ['activemq_collect_duration_seconds 0.25']
+    assert samples['activemq_collect_time_seconds'] == ['activemq_collect_time_seconds 1700000000.5']
+    # the failed read of Q.00003 is Unknown and left out, the health status has no numeric perfdata
+    assert sorted(re.search(r'name="([^"]*)"', sample).group(1) for sample in samples['activemq_queue_size']) == [
+        'Q.00000', 'Q.00001', 'Q.00002', 'Q.00004', 'Q.00005', 'Q.00006', 'Q.00007', 'Q.00008', 'Q.00009']
+    assert 'activemq_queue_size{name="Q.00001",service="queues \\"all\\"\\\\\\n"} 1.0' in samples['activemq_queue_size']
+
+
+def test_metrics_collector(parse, served, tmpdir):
+    args = parse('exporter', '--interval', '60')
+    collector = check_activemq.MetricsCollector(args, {'checks': [{'service': 'DLQ', 'args': ['dlq_expiry_check']}]})
+    text = collector.metrics()
+    assert 'activemq_dlq_expiry_check{name="DLQ",service="DLQ"} 0.0\n' in text
+    requests = served()['http_requests']
+    assert collector.metrics() is text and served()['http_requests'] == requests  # within the interval
+    # the exporter keeps its state apart from the one of the Nagios checks
+    state = os.listdir(check_activemq.plugin_cache_dir(str(tmpdir)))
+    assert [name for name in state if name.startswith('dlq-cache')] == []
+    assert [name for name in state if name.startswith('exporter-dlq-cache')]
@@ -0,0 +1,61 @@
+"""Tests of the keep-alive connection pool against a fake Jolokia agent."""
+
+import json
+
+import pytest
+
+import check_activemq
+
+
+@pytest.fixture
+def collector():
+    """Counts the requests and connections of the test like the timings of a check."""
+    collector = check_activemq.Timings()
+    previous = check_activemq.timings.use(collector)
+    yield collector
+    check_activemq.timings.use(previous)
+
+
+def agent_url(agent, userinfo=''):
+    return 'http://%s127.0.0.1:%d/api/jolokia/read/org.apache.activemq.artemis:broker=%%220.0.0.0%%22/Started' % (
+        userinfo, agent.server_address[1])
+
+
+def test_keep_alive(agent, served, collector):
+    pool = check_activemq.HttpPool()
+    auth = check_activemq.basic_auth('admin', 'admin')
+    for _ in range(3):
+        status, _, body = pool.request(agent_url(agent), auth=auth)
+        assert status == 200 and json.loads(body.decode('utf-8'))['value'] is True
+    assert collector.counters == {'http_requests': 3, 'connections': 1}
+    assert served()['http_requests'] == 3
+    pool.close()
+
+
+def test_retry_closed_connection(agent, collector):
+    pool = check_activemq.HttpPool()
+    auth = check_activemq.basic_auth('admin', 'admin')
+    assert pool.request(agent_url(agent), auth=auth)[0] == 200
+    for connections in pool.idle.values():
+        connections[0].sock.close()  # as if the agent closed the idle connection
+    assert pool.request(agent_url(agent), auth=auth)[0] == 200
+    assert collector.counters == {'http_requests': 2, 'connections': 2}
+    pool.close()
+
+
+def test_connection_refused(agent):
+    pool = check_activemq.HttpPool()
+    url = agent_url(agent)
+    agent.server_close()
+    with pytest.raises(IOError):
+        pool.request(url)
+
+
+def test_credentials(agent):
+    pool = check_activemq.HttpPool()
+    wrong = check_activemq.basic_auth('admin', 'wrong')
+    assert pool.request(agent_url(agent), auth=wrong)[0] == 401
+    assert pool.request(agent_url(agent), auth=check_activemq.basic_auth('admin', 'admin'))[0] == 200
+    assert pool.request(agent_url(agent, 'admin:admin@'), auth=wrong)[0] == 200  # the URL takes precedence
+    assert pool.request(agent_url(agent, 'admin:wrong@'))[0] == 401
+    pool.close()
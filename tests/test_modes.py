@@ -0,0 +1,134 @@
+"""Tests of the check modes against a fake Jolokia agent."""
+
+import os
+import re
+
+import pytest
+
+import check_activemq
+
+
+def run(parse, *argv):
+    args = parse(*argv)
+    return check_activemq.execute_check(check_activemq.instrument(args.func(args), args))
+
+
+def test_queue_rate(parse):
+    exitcode, output = run(parse, 'queue_rate', '--include', 'Q.0000*')
+    assert exitcode == 0 and 'Collecting samples for 10 queues' in output
+    exitcode, output = run(parse, 'queue_rate', '--include', 'Q.0000*')
+    assert exitcode == 0 and output.startswith('ACTIVEMQQUEUERATE OK - Checked 10 queues, highest ')
+    assert "'Q.00009 growth'=0.0/min" in output
+
+
+def test_queue_rate_save_failed(parse):
+    args = parse('queue_rate', '--include', 'Q.0000*')
+    filename = check_activemq.broker_state_file(args, 'queue-samples', 'bin')
+    os.makedirs(filename)  # cannot be replaced by a file
+    exitcode, output = run(parse, 'queue_rate', '--include', 'Q.0000*')
+    assert exitcode == 3 and 'ERROR: Writing queue samples FAILED: ' in output
+    assert 'Fetching network FAILED' not in output
+
+
+def fail_queue(monkeypatch, agent, queue):
+    read = agent.broker.read
+
+    def failing(mbean, attribute=None):
+        if 'queue="%s"' % queue in mbean:
+            return 500, 'java.lang.RuntimeException', 'simulated failure'
+        return read(mbean, attribute)
+    monkeypatch.setattr(agent.broker, 'read', failing)
+
+
+@pytest.mark.parametrize('chunk_size, http_requests, bulk_requests', [(0, 33, 0), (10, 5, 4), (100, 2, 1)])
+def test_queue_size_chunks(parse, served, chunk_size, http_requests, bulk_requests):
+    exitcode, output = run(parse, '--chunk-size', str(chunk_size), 'queue_size', '-w', '100', '-c', '200')
+    assert exitcode == 0 and 'Checked 32 queues with lengths min/avg/max = 0/13.59375/29' in output
+    assert served() == {'http_requests': http_requests, 'jolokia_requests': 33, 'bulk_requests': bulk_requests}
+
+
+def test_fetch_bulk(parse):
+    args = parse('--chunk-size', '3', 'queue_size')
+    urls = []
+    for queue in ['Q.00005', 'DLQ', 'NONE', 'Q.00007']:
+        args.address = ''  # like read_queues, every queue has its own address
+        urls.append(check_activemq.queue_url(args, queue) + '/MessageCount')
+    urls.append(check_activemq.broker_url(args, 'Started'))
+    responses = list(check_activemq.fetch_bulk(args, urls))
+    assert [response['status'] for response in responses] == [200, 200, 404, 200, 200]
+    assert [response.get('value') for response in responses] == [5, 0, None, 7, True]
+
+
+def test_fetch_bulk_rejected(parse, monkeypatch, agent):
+    monkeypatch.setattr(agent, 'credentials', 'other:secret')  # a JSON error object instead of an array
+    args = parse('--chunk-size', '3', 'health')
+    with pytest.raises((IOError, KeyError)):
+        list(check_activemq.fetch_bulk(args, [check_activemq.broker_url(args, 'Started')]))
+
+
+@pytest.mark.parametrize('chunk_size', ['0', '10'])
+def test_queue_size_failed_read(parse, monkeypatch, agent, chunk_size):
+    fail_queue(monkeypatch, agent, 'Q.00003')
+    exitcode, output = run(parse, '--chunk-size', chunk_size, 'queue_size', '-w', '100', '-c', '200')
+    assert exitcode == 3
+    assert output.startswith('ACTIVEMQQUEUESIZE UNKNOWN - ERROR: Fetching Q.00003 FAILED: ')
+    assert "'Q.00002'=2;100;200;0 'Q.00004'=4;100;200;0" in output  # all other queues are still checked
+
+
+def partial_result(output):
+    # the queues read and skipped by queue_size
+    text, _, perfdata = output.partition(' | ')
+    skipped = re.search(r'skipped (\d+) queues \(check timeout exceeded\): ([^ ,]+)', text)
+    return re.findall(r"'?([^' ]+)'?=", perfdata), int(skipped.group(1)), skipped.group(2)
+
+
+def test_queue_size_skipped(parse, monkeypatch, agent):
+    monkeypatch.setenv('TIMEOUT', '2')  # the reads have to finish within a second
+    agent.latency = 0.3
+    exitcode, output = run(parse, '--chunk-size', '4', 'queue_size', '-w', '100', '-c', '200')
+    read, skipped, first_skipped = partial_result(output)
+    assert exitcode == 3 and read and len(read) + skipped == 32
+
+    # the queues skipped last time are read first
+    exitcode, output = run(parse, '--chunk-size', '4', 'queue_size', '-w', '5', '-c', '200')
+    read, skipped, _ = partial_result(output)
+    assert read[0] == first_skipped and len(read) + skipped == 32
+    assert exitcode == 1 and output.startswith('ACTIVEMQQUEUESIZE WARNING - ')  # the state of the queues read
+
+
+def test_queue_size_parallel_skipped(parse, monkeypatch, agent):
+    monkeypatch.setenv('TIMEOUT', '2')
+    agent.latency = 0.3
+    exitcode, output = run(parse, '--chunk-size', '0', 'queue_size', '-w', '100', '-c', '200', '--parallel', '4')
+    read, skipped, _ = partial_result(output)
+    assert exitcode == 3 and read and len(read) + skipped == 32
+
+
+def test_queue_size_top(parse):
+    exitcode, output = run(parse, 'queue_size', '--top', '3', '-w', '28', '-c', '200')
+    text, _, perfdata = output.partition(' | ')
+    assert exitcode == 1 and text.startswith('ACTIVEMQQUEUESIZE WARNING - Queue Size of Q.00029 is 29')
+    assert re.findall(r"'?([^' ]+)'?=", perfdata) == [
+        'Q.00027', 'Q.00028', 'Q.00029', 'queues', 'size_avg', 'size_max', 'size_min', 'size_p50', 'size_p90',
+        'size_p99']
+    exitcode, output = run(parse, 'queue_size', '--top', '2', '-w', '100', '-c', '200')
+    assert exitcode == 0 and output.startswith(
+        'ACTIVEMQQUEUESIZE OK - Checked 32 queues with lengths min/avg/max = 0/13.59/29, p50/p90/p99 = 13/26/29; '
+        'deepest: Q.00029 is 29, Q.00028 is 28 | ')
+
+
+def test_dlq_expiry_check(parse, agent):
+    assert run(parse, 'dlq_expiry_check') == (0, u'ACTIVEMQDLQ OK - First check for DLQ DLQ is 0 | DLQ=0\n')
+    # the state of other addresses is kept apart and merged into the same file
+    assert run(parse, 'dlq_expiry_check', '--address', 'ExpiryQueue')[0] == 0
+    agent.broker.queues['DLQ']['MessageCount'] = 3
+    assert run(parse, 'dlq_expiry_check', '--address', 'DLQ', '--address', 'ExpiryQueue') == (
+        2, u'ACTIVEMQDLQ CRITICAL - More messages in DLQ is 3 | DLQ=3 ExpiryQueue=0\n')
+    assert run(parse, 'dlq_expiry_check') == (0, u'ACTIVEMQDLQ OK - No messages in DLQ is 0 | DLQ=0\n')
+
+
+def test_dlq_expiry_check_save_failed(parse):
+    args = parse('dlq_expiry_check')
+    os.makedirs(check_activemq.broker_state_file(args, 'dlq-cache', 'json'))
+    exitcode, output = run(parse, 'dlq_expiry_check')
+    assert exitcode == 3 and 'Writing DLQ cache FAILED' in output
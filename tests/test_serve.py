@@ -0,0 +1,94 @@
+"""Tests of running checks in-process: run_check, the serve mode and its client."""
+
+import json
+import os
+import socket
+import threading
+import time
+
+import pytest
+
+import check_activemq
+import check_activemq_client
+
+
+@pytest.fixture
+def server(tmpdir):
+    """The socket of a check server, which serves until the tests end."""
+    address = str(tmpdir.join('check.sock'))
+    args = check_activemq.build_parser(mode='serve').parse_args(['serve', '--socket', address])
+    worker = threading.Thread(target=check_activemq.serve, args=(args,))
+    worker.daemon = True
+    worker.start()
+    for _ in range(100):
+        if os.path.exists(address):
+            break
+        time.sleep(0.01)
+    return address
+
+
+def connection_options(agent, user='admin', pwd='admin'):
+    return ['--port', str(agent.server_address[1]), '--host', '127.0.0.1', '-u', user, '-p', pwd]
+
+
+def ask(address, *requests):
+    # sends the requests on one connection and returns the responses
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(address)
+    try:
+        sock.sendall(b''.join(request + b'\n' for request in requests))
+        reader = sock.makefile('rb')
+        return [json.loads(reader.readline().decode('utf-8')) for _ in requests]
+    finally:
+        sock.close()
+
+
+def test_run_check(agent):
+    assert check_activemq.run_check(connection_options(agent) + ['health']) == (
+        0, u'ACTIVEMQHEALTH OK - status True\n')
+    exitcode, output = check_activemq.run_check(connection_options(agent, pwd='wrong') + ['health'])
+    assert exitcode == 3 and output.startswith('ACTIVEMQHEALTH UNKNOWN')
+
+
+def test_execute_check_error():
+    class Failing(check_activemq.np.Resource):
+        def probe(self):
+            raise RuntimeError('broken')
+
+    check = check_activemq.TimedCheck(Failing())
+    check.name = 'failing'
+    assert check_activemq.execute_check(check) == (3, u'FAILING UNKNOWN: RuntimeError: broken\n')
+
+
+def test_serve_client(server, agent, capsys):
+    argv = ['--socket', server] + connection_options(agent) + ['queue_size', 'Q.00001']
+    assert check_activemq_client.main(argv) == 0
+    output = capsys.readouterr()[0]
+    assert output.startswith('ACTIVEMQQUEUESIZE OK - ') and output.endswith(" | 'Q.00001'=1;5;10;0\n")
+
+
+def test_serve_invalid_requests(server, agent):
+    responses = ask(server, json.dumps({'argv': ['--port', 'abc', 'health']}).encode('utf-8'),
+                    json.dumps({'argv': ['--version']}).encode('utf-8'), b'{"args": []}', b'no json',
+                    json.dumps({'argv': connection_options(agent) + ['health']}).encode('utf-8'))
+    assert [response['exitcode'] for response in responses] == [3, 3, 3, 3, 0]
+    assert "invalid int value: 'abc'" in responses[0]['output']
+    assert 'version %s' % check_activemq.PLUGIN_VERSION in responses[1]['output']
+    assert responses[2]['output'].startswith('UNKNOWN: invalid request: ')
+    assert responses[4]['output'] == 'ACTIVEMQHEALTH OK - status True\n'
+
+
+def test_serve_concurrent_credentials(server, agent):
+    # the checks of concurrent requests never use the credentials of one another
+    requests = [json.dumps({'argv': connection_options(agent, pwd=pwd) + ['health']}).encode('utf-8')
+                for pwd in ['admin', 'wrong'] * 8]
+    results = [None] * len(requests)
+
+    def send(index):
+        results[index] = ask(server, requests[index])[0]['exitcode']
+    workers = [threading.Thread(target=send, args=(index,)) for index in range(len(requests))]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert results == [0, 3] * 8
@@ -0,0 +1,14 @@
+"""Tests that the start of the plugin only imports what the selected mode needs, see benchmark/startup.py."""
+
+import pytest
+
+import startup
+
+
+@pytest.mark.parametrize('argv', [['health'], ['queue_size', 'TEST'], ['exists', '--queue', 'TEST'],
+                                  ['broker_property', '--property', 'Version']])
+def test_lazy_modules(argv):
+    _, required = startup.measure(startup.DEPENDENCIES)
+    _, modules = startup.measure(startup.PLUGIN % {'argv': argv})
+    assert 'check_activemq' in modules
+    assert [module for module in startup.LAZY_MODULES if module in modules and module not in required] == []